@@ -12,20 +12,78 @@ Features:
 """
 
 import argparse
+import binascii
+import ctypes
+import heapq
+import itertools
 import json
 import os
+import queue
+import re
+import select
 import signal
+import socket
 import struct
 import subprocess
 import sys
+import threading
 import time
-from collections import Counter, defaultdict
+import typing
+from collections import Counter, OrderedDict, deque
 from dataclasses import dataclass, asdict
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Deque, Dict, List, NamedTuple, Optional, Set
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
 
 VERSION = "1.0.0"
 
+# Raw capture (Linux AF_PACKET)
+ETH_P_ALL = 0x0003
+ARPHRD_IEEE80211_RADIOTAP = 803
+CAP_NET_RAW = 13
+SO_ATTACH_FILTER = 26
+
+# Classic BPF equivalent of 'type mgt subtype deauth or type mgt subtype disassoc'
+# on radiotap frames: (code, jt, jf, k) per struct sock_filter
+DEAUTH_BPF = [
+    (0x30, 0, 0, 3),        # ldb [3]            radiotap length, high byte
+    (0x64, 0, 0, 8),        # lsh #8
+    (0x07, 0, 0, 0),        # tax
+    (0x30, 0, 0, 2),        # ldb [2]            radiotap length, low byte
+    (0x4c, 0, 0, 0),        # or x
+    (0x07, 0, 0, 0),        # tax                x = radiotap length
+    (0x50, 0, 0, 0),        # ldb [x + 0]        802.11 frame control
+    (0x54, 0, 0, 0xfc),     # and #0xfc          type + subtype
+    (0x15, 2, 0, 0xc0),     # jeq #0xc0          mgmt/deauth -> accept
+    (0x15, 1, 0, 0xa0),     # jeq #0xa0          mgmt/disassoc -> accept
+    (0x06, 0, 0, 0),        # ret #0             drop
+    (0x06, 0, 0, 0x40000),  # ret #262144        accept
+]
+SNAPLEN = 2048
+PIPE_CHUNK = 1 << 16
+RECV_BATCH = 256  # max frames drained from the socket per batch
+
+# Number of recent events kept in memory
+MAX_EVENTS = 10_000
+
+# Number of src/dst pairs tracked; least recently seen pairs are evicted
+MAX_FLOWS = 65_536
+
+# Counters kept per heavy-hitter sketch (4x the top 5 reported)
+TOPK_SIZE = 20
+
+# Distinct MACs remembered for the unique counts; beyond this they are lower bounds
+MAX_UNIQUE_MACS = 65_536
+
+# Console output is handed to a writer thread so capture never blocks on stdio
+OUTPUT_QUEUE_SIZE = 4096
+OUTPUT_BATCH = 64
+OUTPUT_FLUSH_INTERVAL = 0.01
+
 class Colors:
     RED = '\033[91m'
     GREEN = '\033[92m'
@@ -38,25 +96,39 @@ class Colors:
     RESET = '\033[0m'
 
 
-@dataclass
-class DeauthEvent:
-    timestamp: str
-    source_mac: str
-    dest_mac: str
-    bssid: str
-    frame_type: str  # deauth or disassoc
+# 802.11 management frame subtypes
+FRAME_DEAUTH = 0xc
+FRAME_DISASSOC = 0xa
+FRAME_NAMES = {FRAME_DEAUTH: "deauth", FRAME_DISASSOC: "disassoc"}
+
+BROADCAST_MAC = b'\xff\xff\xff\xff\xff\xff'
+MULTICAST_BIT = 0x01  # group bit in the first octet
+
+# Pre-rendered event lines, one per frame type (filled with ts/src/dst)
+EVENT_TEMPLATES = {
+    FRAME_DEAUTH: f"🔴 {Colors.DIM}{{ts}}{Colors.RESET} {Colors.RED}DEAUTH  {Colors.RESET} {{src}} -> {{dst}}\n",
+    FRAME_DISASSOC: f"🟡 {Colors.DIM}{{ts}}{Colors.RESET} {Colors.RED}DISASSOC{Colors.RESET} {{src}} -> {{dst}}\n",
+}
+
+
+class DeauthEvent(NamedTuple):
+    timestamp: float  # epoch seconds
+    source_mac: bytes
+    dest_mac: bytes
+    bssid: bytes
+    frame_type: int  # FRAME_DEAUTH or FRAME_DISASSOC
     reason_code: int
     channel: Optional[int] = None
 
 
 @dataclass
 class Alert:
-    timestamp: str
+    timestamp: float  # epoch seconds
     severity: str
     attack_type: str
-    source_mac: str
-    target_mac: str
-    bssid: str
+    source_mac: bytes
+    target_mac: bytes
+    bssid: bytes
     frame_count: int
     description: str
 
@@ -77,21 +149,90 @@ REASON_CODES = {
     11: "Supported channels unacceptable",
 }
 
+# MAC address with an optional tcpdump -e label (BSSID:, DA:, SA:)
+MAC_RE = re.compile(
+    rb'(?:\b(BSSID|DA|SA):)?((?:[0-9a-fA-F]{2}:){5}[0-9a-fA-F]{2})(?![0-9a-fA-F:])'
+)
+
+MAC_FIELDS = ('source_mac', 'dest_mac', 'target_mac', 'bssid')
+
+
+def _fmt_mac(mac: bytes) -> str:
+    """Format a 6-byte MAC as colon-separated hex"""
+    return mac.hex(':')
+
+
+def to_dict(record) -> Dict:
+    """Serialize an event/alert with MACs, timestamp and frame type as strings"""
+    data = record._asdict() if isinstance(record, tuple) else asdict(record)
+    data['timestamp'] = datetime.fromtimestamp(data['timestamp']).isoformat()
+    if 'frame_type' in data:
+        data['frame_type'] = FRAME_NAMES[data['frame_type']]
+    for field in MAC_FIELDS:
+        if field in data:
+            data[field] = _fmt_mac(data[field])
+    return data
+
+
+def misra_gries_update(sketch: Dict[bytes, int], counts: Counter, size: int = TOPK_SIZE):
+    """Fold weighted counts into a Misra-Gries heavy-hitter sketch"""
+    for item, count in counts.items():
+        if item in sketch:
+            sketch[item] += count
+            continue
+        if len(sketch) >= size:
+            # Decrement everything by the smallest amount that frees a slot
+            dec = min(count, min(sketch.values()))
+            for key in list(sketch):
+                sketch[key] -= dec
+                if not sketch[key]:
+                    del sketch[key]
+            count -= dec
+        if count:
+            sketch[item] = count
+
+
+def dump_json(obj, indent: bool = False) -> bytes:
+    """Encode obj as UTF-8 JSON, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
 
 class DeauthDetector:
-    def __init__(self, interface: str, threshold: int = 10, window: int = 60):
+    def __init__(self, interface: str, threshold: int = 10, window: int = 60,
+                 quiet: bool = False, alert_log: Optional[str] = None):
         self.interface = interface
         self.threshold = threshold  # frames per window to trigger alert
         self.window = window        # time window in seconds
+        self.window_ns = window * 1_000_000_000
+        self.quiet = quiet          # suppress live event/alert output
+        self.alert_log = alert_log  # NDJSON file alerts are streamed to
+        self._alert_file = None
         
-        self.events: List[DeauthEvent] = []
+        self.events: Deque[DeauthEvent] = deque(maxlen=MAX_EVENTS)
+        self.total_events = 0
+        self.suppressed_events = 0
         self.alerts: List[Alert] = []
         self.running = False
         
-        # Track deauth counts per source/target pair
-        self.deauth_counts: Dict[str, List[float]] = defaultdict(list)
-        self.source_counts = Counter()
-        self.target_counts = Counter()
+        # Track deauth counts per source/target pair, in LRU order
+        # Times are integer time.monotonic_ns() readings
+        self.deauth_counts: typing.OrderedDict[bytes, Deque[int]] = OrderedDict()
+        self.last_alert: Dict[bytes, int] = {}
+        # Frames per pair since its last alert (or the start of its burst)
+        self.frame_counts: Dict[bytes, int] = {}
+        # Approximate top sources/targets in constant memory
+        self.source_counts: Dict[bytes, int] = {}
+        self.target_counts: Dict[bytes, int] = {}
+        self.unique_sources: Set[bytes] = set()
+        self.unique_targets: Set[bytes] = set()
+        
+        self.dropped_lines = 0
+        self.output_broken = False  # set when stdout fails (e.g. closed pipe)
+        self._out_q: queue.Queue = queue.Queue(maxsize=OUTPUT_QUEUE_SIZE)
+        self._writer_thread = threading.Thread(target=self._writer, daemon=True)
+        self._writer_thread.start()
         
     def start_monitor(self):
         """Start monitoring for deauth frames"""
@@ -103,105 +244,277 @@ class DeauthDetector:
         print(f"\n{Colors.YELLOW}Waiting for deauth frames... (Ctrl+C to stop){Colors.RESET}\n")
         
         try:
-            # Use tcpdump to capture deauth frames
-            # Filter for deauth (subtype 0xc) and disassoc (subtype 0xa) frames
-            cmd = [
-                'tcpdump', '-i', self.interface, '-l', '-e',
-                'type mgt subtype deauth or type mgt subtype disassoc'
-            ]
-            
-            proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            # The log belongs to this run; it is recreated on the first alert
+            if self.alert_log and os.path.exists(self.alert_log):
+                os.remove(self.alert_log)
             
-            while self.running:
-                line = proc.stdout.readline()
-                if line:
-                    self.parse_frame(line)
-                    
+            if hasattr(socket, 'AF_PACKET'):
+                self.capture_socket()
+            else:
+                self.capture_tcpdump()
         except KeyboardInterrupt:
             self.running = False
         except Exception as e:
             print(f"{Colors.RED}Error: {e}{Colors.RESET}")
             
-    def parse_frame(self, line: str):
-        """Parse tcpdump output for deauth/disassoc frames"""
+    def capture_socket(self):
+        """Capture raw radiotap frames from a monitor-mode interface"""
+        # Protocol 0 receives nothing until bind, so no frame can arrive
+        # before the filter is attached
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, 0)
+        buf = bytearray(SNAPLEN)
+        view = memoryview(buf)
         try:
-            # Extract MAC addresses from tcpdump output
-            parts = line.split()
+            self.attach_filter(sock)
+            # The bind tuple takes the protocol in host order
+            sock.bind((self.interface, ETH_P_ALL))
+            # Only monitor-mode interfaces deliver radiotap-framed 802.11
+            if sock.getsockname()[3] != ARPHRD_IEEE80211_RADIOTAP:
+                raise RuntimeError(f"{self.interface} is not in monitor mode (radiotap)")
+            sock.setblocking(False)
+            while self.running:
+                ready, _, _ = select.select([sock], [], [], 1.0)
+                if not ready:
+                    continue
+                # Drain what is queued before waiting again; one clock
+                # reading stamps the whole batch
+                now = time.time()
+                batch = []
+                while len(batch) < RECV_BATCH:
+                    try:
+                        n = sock.recv_into(buf)
+                    except BlockingIOError:
+                        break
+                    event = self.parse_packet(view[:n], now)
+                    if event:
+                        batch.append(event)
+                if batch:
+                    self.process_events(batch)
+        finally:
+            sock.close()
             
-            # Simple extraction - format varies by tcpdump version
-            frame_type = "deauth" if "Deauthentication" in line else "disassoc"
+    def attach_filter(self, sock: socket.socket):
+        """Drop non-deauth/disassoc frames in the kernel via SO_ATTACH_FILTER"""
+        insns = b''.join(struct.pack('HBBI', *insn) for insn in DEAUTH_BPF)
+        prog = ctypes.create_string_buffer(insns, len(insns))
+        # struct sock_fprog { unsigned short len; struct sock_filter *filter; }
+        fprog = struct.pack('HP', len(DEAUTH_BPF), ctypes.addressof(prog))
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+        except OSError as e:
+            # parse_packet still filters, just after the copy to userspace
+            print(f"{Colors.YELLOW}Warning: kernel filter unavailable ({e}){Colors.RESET}")
             
-            # Find MAC addresses (format: xx:xx:xx:xx:xx:xx)
+    def capture_tcpdump(self):
+        """Fallback capture through tcpdump where AF_PACKET is unavailable"""
+        # Filter for deauth (subtype 0xc) and disassoc (subtype 0xa) frames
+        cmd = [
+            'tcpdump', '-i', self.interface, '-U', '-l', '-e',
+            'type mgt subtype deauth or type mgt subtype disassoc'
+        ]
+        
+        # stderr is inherited so tcpdump's own errors reach the terminal
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            bufsize=PIPE_CHUNK
+        )
+        
+        tail = b""
+        try:
+            while self.running:
+                chunk = proc.stdout.read1(PIPE_CHUNK)
+                if not chunk:
+                    break
+                # Keep the trailing partial line for the next read
+                lines = (tail + chunk).split(b"\n")
+                tail = lines.pop()
+                now = time.time()
+                batch = [e for e in (self.parse_frame(line, now) for line in lines) if e]
+                if batch:
+                    self.process_events(batch)
+            event = self.parse_frame(tail, time.time())
+            if event:
+                self.process_event(event)
+        finally:
+            proc.terminate()
+            proc.wait()
+            
+    def parse_packet(self, buf: memoryview, timestamp: float) -> Optional[DeauthEvent]:
+        """Decode a radiotap + 802.11 management frame by fixed offsets"""
+        # Radiotap: version (0) at byte 0, little-endian header length at 2
+        if len(buf) < 4 or buf[0] != 0:
+            return None
+        (rt_len,) = struct.unpack_from('<H', buf, 2)
+        
+        # 24-byte management header followed by the 2-byte reason code
+        if len(buf) < rt_len + 26:
+            return None
+        
+        # Frame control: type in bits 2-3 (0 = management), subtype in bits 4-7
+        fc = buf[rt_len]
+        if fc & 0x0c:
+            return None
+        frame_type = fc >> 4
+        if frame_type != FRAME_DEAUTH and frame_type != FRAME_DISASSOC:
+            return None
+        
+        (reason_code,) = struct.unpack_from('<H', buf, rt_len + 24)
+        
+        return DeauthEvent(
+            timestamp=timestamp,
+            source_mac=bytes(buf[rt_len + 10:rt_len + 16]),
+            dest_mac=bytes(buf[rt_len + 4:rt_len + 10]),
+            bssid=bytes(buf[rt_len + 16:rt_len + 22]),
+            frame_type=frame_type,
+            reason_code=reason_code
+        )
+            
+    def parse_frame(self, line: bytes, timestamp: float) -> Optional[DeauthEvent]:
+        """Parse tcpdump output for deauth/disassoc frames"""
+        try:
+            frame_type = FRAME_DISASSOC if b"Disassociation" in line else FRAME_DEAUTH
+            
+            # One regex pass finds every MAC; -e output labels them SA/DA/BSSID
+            labelled = {}
             macs = []
-            for part in parts:
-                if len(part) == 17 and part.count(':') == 5:
-                    macs.append(part.lower())
+            for label, mac in MAC_RE.findall(line):
+                mac = binascii.unhexlify(mac.replace(b':', b''))
+                if label:
+                    labelled.setdefault(label, mac)
+                else:
+                    macs.append(mac)
             
-            if len(macs) >= 2:
-                event = DeauthEvent(
-                    timestamp=datetime.now().isoformat(),
-                    source_mac=macs[0],
-                    dest_mac=macs[1],
-                    bssid=macs[2] if len(macs) > 2 else macs[0],
-                    frame_type=frame_type,
-                    reason_code=0
-                )
-                
-                self.process_event(event)
+            if b'SA' in labelled and b'DA' in labelled:
+                source, dest = labelled[b'SA'], labelled[b'DA']
+                bssid = labelled.get(b'BSSID', source)
+            elif len(macs) >= 2:
+                source, dest = macs[0], macs[1]
+                bssid = macs[2] if len(macs) > 2 else macs[0]
+            else:
+                return None
+            
+            return DeauthEvent(
+                timestamp=timestamp,
+                source_mac=source,
+                dest_mac=dest,
+                bssid=bssid,
+                frame_type=frame_type,
+                reason_code=0
+            )
                 
         except Exception:
-            pass
+            return None
     
     def process_event(self, event: DeauthEvent):
-        """Process a deauth event and check for attacks"""
-        self.events.append(event)
-        
-        # Update counters
-        self.source_counts[event.source_mac] += 1
-        self.target_counts[event.dest_mac] += 1
-        
-        # Track timing for threshold detection
-        key = f"{event.source_mac}->{event.dest_mac}"
-        current_time = time.time()
-        self.deauth_counts[key].append(current_time)
-        
-        # Remove old entries
-        self.deauth_counts[key] = [
-            t for t in self.deauth_counts[key]
-            if current_time - t < self.window
-        ]
+        """Process a single deauth event and check for attacks"""
+        self.process_events([event])
         
-        # Print event
-        self.print_event(event)
+    def process_events(self, events: List[DeauthEvent]):
+        """Process a batch of deauth events and check for attacks"""
+        self.total_events += len(events)
         
-        # Check threshold
-        if len(self.deauth_counts[key]) >= self.threshold:
-            self.generate_alert(event, len(self.deauth_counts[key]))
+        # Aggregate the batch in C, then fold it into the sketches
+        sources = Counter([e.source_mac for e in events])
+        targets = Counter([e.dest_mac for e in events])
+        misra_gries_update(self.source_counts, sources)
+        misra_gries_update(self.target_counts, targets)
+        
+        # Capped distinct sets: stop growing once the cap is reached
+        if len(self.unique_sources) < MAX_UNIQUE_MACS:
+            self.unique_sources.update(sources)
+        if len(self.unique_targets) < MAX_UNIQUE_MACS:
+            self.unique_targets.update(targets)
+        
+        current_time = time.monotonic_ns()
+        cutoff = current_time - self.window_ns
+        
+        # Hot loop: bind attributes to locals once per batch
+        flows = self.deauth_counts
+        last_alert = self.last_alert
+        frame_counts = self.frame_counts
+        threshold = self.threshold
+        window = self.window_ns
+        record = self.events.append
+        show = None if self.quiet else self.print_event
+        suppressed = 0
+        
+        for event in events:
+            # Track timing for threshold detection
+            key = event.source_mac + event.dest_mac
+            times = flows.get(key)
+            if times is None:
+                # Bounded: once past the threshold, older times add no information
+                times = flows[key] = deque(maxlen=threshold * 2)
+                if len(flows) > MAX_FLOWS:
+                    stale, _ = flows.popitem(last=False)
+                    last_alert.pop(stale, None)
+                    frame_counts.pop(stale, None)
+            else:
+                flows.move_to_end(key)
+            
+            # The deque is capped, so keep the uncapped running count here;
+            # a pair quiet for a whole window starts a new burst
+            if times and times[-1] > cutoff:
+                frames = frame_counts.get(key, 0) + 1
+            else:
+                frames = 1
+            frame_counts[key] = frames
+            times.append(current_time)
+            
+            # Drop entries that fell out of the window (oldest first)
+            while times and times[0] <= cutoff:
+                times.popleft()
+            count = len(times)
+            
+            # A full window means the flood is established: count the frame
+            # but don't record or print it, the first frames carry the signal
+            if count == times.maxlen:
+                suppressed += 1
+            else:
+                record(event)
+                if show:
+                    show(event)
+            
+            # Check threshold, alerting at most once per window for each pair
+            if count >= threshold:
+                last = last_alert.get(key)
+                if last is None or current_time - last >= window:
+                    last_alert[key] = current_time
+                    frame_counts[key] = 0
+                    self.generate_alert(event, frames)
+        
+        self.suppressed_events += suppressed
             
     def print_event(self, event: DeauthEvent):
         """Print deauth event"""
-        icon = "🔴" if event.frame_type == "deauth" else "🟡"
+        line = EVENT_TEMPLATES[event.frame_type].format(
+            ts=time.strftime('%H:%M:%S', time.localtime(event.timestamp)),
+            src=_fmt_mac(event.source_mac),
+            dst=_fmt_mac(event.dest_mac)
+        )
         
-        print(f"{icon} {Colors.DIM}{event.timestamp[11:19]}{Colors.RESET} ", end="")
-        print(f"{Colors.RED}{event.frame_type.upper():8}{Colors.RESET} ", end="")
-        print(f"{event.source_mac} -> {event.dest_mac}")
+        # Drop rather than stall capture when the terminal can't keep up
+        try:
+            self._out_q.put_nowait(line)
+        except queue.Full:
+            self.dropped_lines += 1
         
     def generate_alert(self, event: DeauthEvent, count: int):
         """Generate attack alert"""
         # Determine attack type
-        if event.dest_mac == "ff:ff:ff:ff:ff:ff":
+        if event.dest_mac == BROADCAST_MAC:
             attack_type = "Broadcast Deauth Attack"
             severity = "critical"
-            description = f"Broadcast deauth flood from {event.source_mac}"
+            description = f"Broadcast deauth flood from {_fmt_mac(event.source_mac)}"
+        elif event.dest_mac[0] & MULTICAST_BIT:
+            attack_type = "Multicast Deauth Attack"
+            severity = "critical"
+            description = f"Multicast deauth flood: {_fmt_mac(event.source_mac)} -> {_fmt_mac(event.dest_mac)}"
         else:
             attack_type = "Targeted Deauth Attack"
             severity = "high"
-            description = f"Targeted deauth attack: {event.source_mac} -> {event.dest_mac}"
+            description = f"Targeted deauth attack: {_fmt_mac(event.source_mac)} -> {_fmt_mac(event.dest_mac)}"
         
         alert = Alert(
             timestamp=event.timestamp,
@@ -215,30 +528,112 @@ class DeauthDetector:
         )
         
         self.alerts.append(alert)
-        self.print_alert(alert)
+        if self.alert_log:
+            self.log_alert(alert)
+        if not self.quiet:
+            self.print_alert(alert)
+        
+    def log_alert(self, alert: Alert):
+        """Append an alert to the NDJSON log, creating it on first use"""
+        try:
+            if self._alert_file is None:
+                self._alert_file = open(self.alert_log, 'wb')
+            self._alert_file.write(dump_json(to_dict(alert)) + b'\n')
+            self._alert_file.flush()
+        except OSError as e:
+            # Keep monitoring; alerts are still collected in self.alerts
+            print(f"{Colors.YELLOW}Warning: alert log disabled ({e}){Colors.RESET}")
+            self.alert_log = None
+            if self._alert_file:
+                try:
+                    self._alert_file.close()
+                except OSError:
+                    pass
+                self._alert_file = None
         
     def print_alert(self, alert: Alert):
         """Print alert prominently"""
         color = Colors.RED if alert.severity == "critical" else Colors.YELLOW
         
-        print(f"\n{color}{'═' * 60}")
-        print(f"  [!]  ALERT: {alert.attack_type}")
-        print(f"  Severity: {alert.severity.upper()}")
-        print(f"  Source: {alert.source_mac}")
-        print(f"  Target: {alert.target_mac}")
-        print(f"  BSSID: {alert.bssid}")
-        print(f"  Frames: {alert.frame_count} in {self.window}s")
-        print(f"{'═' * 60}{Colors.RESET}\n")
+        line = (
+            f"\n{color}{'═' * 60}\n"
+            f"  [!]  ALERT: {alert.attack_type}\n"
+            f"  Severity: {alert.severity.upper()}\n"
+            f"  Source: {_fmt_mac(alert.source_mac)}\n"
+            f"  Target: {_fmt_mac(alert.target_mac)}\n"
+            f"  BSSID: {_fmt_mac(alert.bssid)}\n"
+            f"  Frames: {alert.frame_count} (window {self.window}s)\n"
+            f"{'═' * 60}{Colors.RESET}\n\n"
+        )
+        
+        # Capture must not block; the alert is still kept in self.alerts
+        try:
+            self._out_q.put_nowait(line)
+        except queue.Full:
+            self.dropped_lines += 1
+        
+    def _writer(self):
+        """Write queued output in batches until close() is called"""
+        while True:
+            item = self._out_q.get()
+            batch = []
+            deadline = time.monotonic() + OUTPUT_FLUSH_INTERVAL
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= OUTPUT_BATCH:
+                    break
+                try:
+                    item = self._out_q.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            
+            # After stdout breaks keep draining so producers never block
+            if batch and not self.output_broken:
+                try:
+                    sys.stdout.write(''.join(batch))
+                    sys.stdout.flush()
+                except (OSError, ValueError):
+                    self.output_broken = True
+            if item is None:
+                return
+            
+    def close(self):
+        """Flush pending output and stop the writer thread"""
+        # Only wait for queue space while the writer can still drain it
+        while self._writer_thread.is_alive():
+            try:
+                self._out_q.put(None, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self._writer_thread.join()
+        
+        if self._alert_file:
+            self._alert_file.close()
+            self._alert_file = None
+        
+        if self.dropped_lines and not self.output_broken:
+            print(f"{Colors.DIM}({self.dropped_lines} event lines dropped){Colors.RESET}")
+        
+    @staticmethod
+    def _top(sketch: Dict[bytes, int], n: int = 5) -> List:
+        """Largest sketch entries; counts are lower bounds"""
+        top = heapq.nlargest(n, sketch.items(), key=lambda item: item[1])
+        return [(_fmt_mac(mac), count) for mac, count in top]
         
     def get_stats(self) -> Dict:
         """Get detection statistics"""
         return {
-            'total_events': len(self.events),
+            'total_events': self.total_events,
+            'suppressed_events': self.suppressed_events,
             'total_alerts': len(self.alerts),
-            'unique_sources': len(self.source_counts),
-            'unique_targets': len(self.target_counts),
-            'top_sources': self.source_counts.most_common(5),
-            'top_targets': self.target_counts.most_common(5)
+            'unique_sources': len(self.unique_sources),
+            'unique_targets': len(self.unique_targets),
+            # True when the count hit MAX_UNIQUE_MACS and is a lower bound
+            'unique_sources_capped': len(self.unique_sources) >= MAX_UNIQUE_MACS,
+            'unique_targets_capped': len(self.unique_targets) >= MAX_UNIQUE_MACS,
+            'top_sources': self._top(self.source_counts),
+            'top_targets': self._top(self.target_counts)
         }
 
 
@@ -250,36 +645,38 @@ def demo_mode():
     
     # Simulate deauth events
     events = [
-        ("aa:bb:cc:dd:ee:01", "11:22:33:44:55:66", "deauth"),
-        ("aa:bb:cc:dd:ee:01", "11:22:33:44:55:66", "deauth"),
-        ("aa:bb:cc:dd:ee:02", "ff:ff:ff:ff:ff:ff", "deauth"),  # Broadcast
-        ("aa:bb:cc:dd:ee:01", "11:22:33:44:55:66", "deauth"),  # Triggers alert
-        ("aa:bb:cc:dd:ee:02", "ff:ff:ff:ff:ff:ff", "deauth"),
-        ("aa:bb:cc:dd:ee:02", "ff:ff:ff:ff:ff:ff", "deauth"),  # Triggers alert
-        ("aa:bb:cc:dd:ee:03", "77:88:99:aa:bb:cc", "disassoc"),
-        ("aa:bb:cc:dd:ee:01", "11:22:33:44:55:66", "deauth"),
+        ("aa:bb:cc:dd:ee:01", "00:11:22:33:44:55", FRAME_DEAUTH),
+        ("aa:bb:cc:dd:ee:01", "00:11:22:33:44:55", FRAME_DEAUTH),
+        ("aa:bb:cc:dd:ee:02", "ff:ff:ff:ff:ff:ff", FRAME_DEAUTH),  # Broadcast
+        ("aa:bb:cc:dd:ee:01", "00:11:22:33:44:55", FRAME_DEAUTH),  # Triggers alert
+        ("aa:bb:cc:dd:ee:02", "ff:ff:ff:ff:ff:ff", FRAME_DEAUTH),
+        ("aa:bb:cc:dd:ee:02", "ff:ff:ff:ff:ff:ff", FRAME_DEAUTH),  # Triggers alert
+        ("aa:bb:cc:dd:ee:03", "00:77:88:99:aa:bb", FRAME_DISASSOC),
+        ("aa:bb:cc:dd:ee:01", "00:11:22:33:44:55", FRAME_DEAUTH),
     ]
     
     for src, dst, ftype in events:
         event = DeauthEvent(
-            timestamp=datetime.now().isoformat(),
-            source_mac=src,
-            dest_mac=dst,
-            bssid=src,
+            timestamp=time.time(),
+            source_mac=bytes.fromhex(src.replace(':', '')),
+            dest_mac=bytes.fromhex(dst.replace(':', '')),
+            bssid=bytes.fromhex(src.replace(':', '')),
             frame_type=ftype,
             reason_code=1
         )
         detector.process_event(event)
         time.sleep(0.5)
     
+    detector.close()
+    
     # Print stats
     stats = detector.get_stats()
     print(f"\n{Colors.CYAN}{'─' * 60}{Colors.RESET}")
     print(f"{Colors.BOLD}Statistics:{Colors.RESET}")
     print(f"  Total events: {stats['total_events']}")
     print(f"  Alerts triggered: {stats['total_alerts']}")
-    print(f"  Unique sources: {stats['unique_sources']}")
-    print(f"  Unique targets: {stats['unique_targets']}")
+    print(f"  Unique sources: {'≥' if stats['unique_sources_capped'] else ''}{stats['unique_sources']}")
+    print(f"  Unique targets: {'≥' if stats['unique_targets_capped'] else ''}{stats['unique_targets']}")
     
     if stats['top_sources']:
         print(f"\n{Colors.BOLD}Top Attack Sources:{Colors.RESET}")
@@ -287,6 +684,20 @@ def demo_mode():
             print(f"  {mac}: {count} frames")
 
 
+def has_capture_privileges() -> Optional[bool]:
+    """Check for root or CAP_NET_RAW; None if capabilities can't be read"""
+    if os.geteuid() == 0:
+        return True
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('CapEff:'):
+                    return bool(int(line.split()[1], 16) >> CAP_NET_RAW & 1)
+    except OSError:
+        pass
+    return None
+
+
 def print_banner():
     print(f"""{Colors.CYAN}
  __        ___ _____ _   ____             _   _     
@@ -303,10 +714,16 @@ def main():
     parser.add_argument("-i", "--interface", default="wlan0", help="Wireless interface")
     parser.add_argument("-t", "--threshold", type=int, default=10, help="Alert threshold")
     parser.add_argument("-w", "--window", type=int, default=60, help="Time window (seconds)")
-    parser.add_argument("-o", "--output", help="Output file (JSON)")
+    parser.add_argument("-o", "--output",
+                        help="Output file (JSON); alerts are also streamed to <output>.alerts.ndjson")
+    parser.add_argument("-q", "--quiet", action="store_true", help="No live output (use with -o)")
     parser.add_argument("--demo", action="store_true", help="Run demo mode")
     
     args = parser.parse_args()
+    if args.threshold < 1:
+        parser.error("--threshold must be at least 1")
+    if args.window < 1:
+        parser.error("--window must be at least 1")
     
     print_banner()
     
@@ -314,31 +731,50 @@ def main():
         demo_mode()
         return
     
-    # Check for root
-    if os.geteuid() != 0:
+    # Check for root / CAP_NET_RAW before spinning up capture
+    privileged = has_capture_privileges()
+    if privileged is False:
+        print(f"{Colors.RED}Error: packet capture needs root or CAP_NET_RAW")
+        print(f"Use --demo for demonstration mode.{Colors.RESET}")
+        sys.exit(1)
+    if privileged is None:
         print(f"{Colors.YELLOW}Warning: Root privileges recommended for packet capture")
         print(f"Use --demo for demonstration mode.{Colors.RESET}\n")
     
+    # Stream alerts next to the final report so a crash doesn't lose them
+    alert_log = None
+    if args.output:
+        alert_log = os.path.splitext(args.output)[0] + '.alerts.ndjson'
+    
     detector = DeauthDetector(
         interface=args.interface,
         threshold=args.threshold,
-        window=args.window
+        window=args.window,
+        quiet=args.quiet,
+        alert_log=alert_log
     )
     
     try:
         detector.start_monitor()
     except KeyboardInterrupt:
         pass
+    finally:
+        detector.close()
     
     if args.output:
         output = {
             'stats': detector.get_stats(),
-            'alerts': [asdict(a) for a in detector.alerts],
-            'events': [asdict(e) for e in detector.events[-100:]]
+            'alerts': [to_dict(a) for a in detector.alerts],
+            'events': [
+                to_dict(e) for e in
+                itertools.islice(detector.events, max(0, len(detector.events) - 100), None)
+            ]
         }
-        with open(args.output, 'w') as f:
-            json.dump(output, f, indent=2)
+        with open(args.output, 'wb') as f:
+            f.write(dump_json(output, indent=True))
         print(f"\n{Colors.GREEN}Results saved to: {args.output}{Colors.RESET}")
+        if detector.alert_log and detector.alerts:
+            print(f"{Colors.GREEN}Alert log: {alert_log}{Colors.RESET}")
 
 
 if __name__ == "__main__":